@@ -2,17 +2,82 @@
 """
 Comprehensive Test Suite for All PyTorch GPU Models
 Tests all 6 models to ensure they work properly
+
+Usage:  python test_all_models.py [--in-process]
+
+By default each model runs in its own subprocess, concurrently across the
+visible GPUs. With --in-process the models run one after another inside this
+interpreter via runpy, so they share a single CUDA context.
 """
 
+import asyncio
+import contextlib
 import os
+import runpy
+import shutil
+import signal
 import sys
-import subprocess
 import time
+import traceback
 from pathlib import Path
 
+NIXNAN_PATH = "/home/ganesh/nixnan.so"
+
+
+class ScriptTimeout(BaseException):
+    """Raised inside an in-process model script when it exceeds its timeout"""
+
+
+def visible_gpus():
+    """CUDA device ids visible to this process"""
+    visible = os.environ.get("CUDA_VISIBLE_DEVICES")
+    if visible is not None:
+        return [device.strip() for device in visible.split(",") if device.strip()]
+    try:
+        import torch
+        return [str(i) for i in range(torch.cuda.device_count())]
+    except ImportError:
+        return []
+
+
+def warm_up_gpu():
+    """Create the CUDA context and prime cuBLAS/cuDNN once, before the first model"""
+    try:
+        import torch
+        import torch.nn.functional as F
+        if not torch.cuda.is_available():
+            return
+        matrix = torch.zeros(1024, 1024, device='cuda')
+        matrix @ matrix
+        F.conv2d(torch.zeros(1, 3, 32, 32, device='cuda'),
+                 torch.zeros(8, 3, 3, 3, device='cuda'))
+        torch.cuda.synchronize()
+    except Exception:
+        pass
+
+
+def log_paths(script_path):
+    """Per-model (stdout, stderr) log files, kept next to the script"""
+    model_dir = script_path.parent
+    return (model_dir / f".{script_path.stem}.stdout",
+            model_dir / f".{script_path.stem}.stderr")
+
+
+def last_line(path, max_bytes=4096):
+    """Last non-empty line of a log file, reading only its final block"""
+    with open(path, 'rb') as f:
+        size = f.seek(0, os.SEEK_END)
+        f.seek(max(size - max_bytes, 0))
+        lines = f.read().decode(errors='replace').strip().split('\n')
+    return lines[-1]
+
+
 class ModelTester:
-    def __init__(self):
+    def __init__(self, in_process=False):
         self.base_dir = Path("/home/ganesh/pytorch_GPU")
+        self.in_process = in_process
+        # Environment shared by every model subprocess
+        self._base_env = {**os.environ, "LD_PRELOAD": NIXNAN_PATH}
         self.results = {}
         self.passed = 0
         self.failed = 0
@@ -20,73 +85,53 @@ class ModelTester:
         print("🧪 PyTorch GPU Models Test Suite")
         print("=" * 60)
         print(f"Base directory: {self.base_dir}")
+        print(f"Mode: {'in-process' if in_process else 'subprocess per model'}")
         print(f"Testing all models for basic functionality...")
         print("=" * 60)
     
-    def run_test(self, model_name, script_path, timeout=120):
+    async def run_test(self, model_name, script_path, timeout=120, gpu=None):
         """Run a single model test"""
-        print(f"\n🔄 Testing {model_name}...")
-        print(f"   Script: {script_path}")
+        print(f"▶️  Starting {model_name} ({script_path.name})", flush=True)
         
         start_time = time.time()
+        proc = None
         
         try:
-            # Change to the model directory
+            # Run the script from its own directory
             model_dir = script_path.parent
-            original_dir = os.getcwd()
-            os.chdir(model_dir)
-            
-            # Run the script with timeout
-
-            # Copy current environment and add LD_PRELOAD
-            env = os.environ.copy()
-            env["LD_PRELOAD"] = "/home/ganesh/nixnan.so"  
-
-            # Run the subprocess with the modified environment
-            subprocess.run([sys.executable, str(script_path.resolve())], env=env)
-
             
-            print("---> Running :", script_path.name, " with LD_PRELOAD set.")
-            result = subprocess.run(
-                [sys.executable, script_path.name],
-                capture_output=True,
-                text=True,
-                timeout=timeout,
-                env=env
-            )
-            print("Run of :", script_path.name, " finished <---")
+            # Only copy the shared environment when pinning this model to a GPU
+            env = self._base_env
+            if gpu is not None:
+                env = {**self._base_env, "CUDA_VISIBLE_DEVICES": gpu}
             
-            # Change back to original directory
-            os.chdir(original_dir)
+            # Child output goes straight to the log files, not through Python;
+            # print_model_outputs() replays it under the model's header
+            out_path, err_path = log_paths(script_path)
+            with open(out_path, 'wb') as out_f, open(err_path, 'wb') as err_f:
+                # No preexec_fn, session or uid/gid changes: keeps CPython on its
+                # vfork()+exec path, so launch cost does not grow with our RSS
+                proc = await asyncio.create_subprocess_exec(
+                    sys.executable, script_path.name,
+                    stdout=out_f,
+                    stderr=err_f,
+                    env=env,
+                    cwd=model_dir,
+                    close_fds=True,
+                    start_new_session=False
+                )
+                await asyncio.wait_for(proc.wait(), timeout)
             
             elapsed_time = time.time() - start_time
-            
-            if result.returncode == 0:
-                print(f"   ✅ PASSED ({elapsed_time:.1f}s)")
-                self.results[model_name] = {
-                    'status': 'PASSED',
-                    'time': elapsed_time,
-                    'stdout': result.stdout,
-                    'stderr': result.stderr
-                }
-                self.passed += 1
-                return True
-            else:
-                print(f"   ❌ FAILED ({elapsed_time:.1f}s)")
-                print(f"   Error: {result.stderr}")
-                self.results[model_name] = {
-                    'status': 'FAILED',
-                    'time': elapsed_time,
-                    'stdout': result.stdout,
-                    'stderr': result.stderr,
-                    'returncode': result.returncode
-                }
-                self.failed += 1
-                return False
+            return self._record_completed(
+                model_name, proc.returncode, out_path, err_path, elapsed_time
+            )
                 
-        except subprocess.TimeoutExpired:
-            os.chdir(original_dir)
-            print(f"   ⏰ TIMEOUT ({timeout}s)")
+        except asyncio.TimeoutError:
+            if proc.returncode is None:
+                proc.kill()
+                await proc.wait()
+            print(f"   ⏰ {model_name} TIMEOUT ({timeout}s)")
             self.results[model_name] = {
                 'status': 'TIMEOUT',
                 'time': timeout,
@@ -96,7 +141,7 @@ class ModelTester:
             return False
             
         except FileNotFoundError:
-            print(f"   📁 FILE NOT FOUND")
+            print(f"   📁 {model_name} FILE NOT FOUND")
             self.results[model_name] = {
                 'status': 'FILE_NOT_FOUND',
                 'time': 0,
@@ -106,8 +151,45 @@ class ModelTester:
             return False
             
         except Exception as e:
-            os.chdir(original_dir)
-            print(f"   ❌ ERROR: {e}")
+            print(f"   ❌ {model_name} ERROR: {e}")
+            self.results[model_name] = {
+                'status': 'ERROR',
+                'time': time.time() - start_time,
+                'error': str(e)
+            }
+            self.failed += 1
+            return False
+    
+    def run_test_in_proc(self, model_name, script_path, timeout=120):
+        """Run a single model test inside this interpreter"""
+        # flush so our marker stays in order with nixnan's fd-level output
+        print(f"▶️  Starting {model_name} ({script_path.name})", flush=True)
+        
+        start_time = time.time()
+        
+        try:
+            out_path, err_path = log_paths(script_path)
+            # line-buffered so Python prints interleave with nixnan's direct fd writes
+            with open(out_path, 'w', buffering=1) as out_f, open(err_path, 'w', buffering=1) as err_f:
+                returncode = self._run_in_proc(script_path, timeout, out_f, err_f)
+            
+            elapsed_time = time.time() - start_time
+            return self._record_completed(
+                model_name, returncode, out_path, err_path, elapsed_time
+            )
+            
+        except ScriptTimeout:
+            print(f"   ⏰ {model_name} TIMEOUT ({timeout}s)")
+            self.results[model_name] = {
+                'status': 'TIMEOUT',
+                'time': timeout,
+                'error': 'Test exceeded timeout limit'
+            }
+            self.failed += 1
+            return False
+            
+        except Exception as e:
+            print(f"   ❌ {model_name} ERROR: {e}")
             self.results[model_name] = {
                 'status': 'ERROR',
                 'time': time.time() - start_time,
@@ -116,6 +198,149 @@ class ModelTester:
             self.failed += 1
             return False
     
+    def _run_in_proc(self, script_path, timeout, stdout, stderr):
+        """Execute a script as __main__ in this interpreter.
+        
+        sys.argv, sys.path and the working directory are restored afterwards,
+        and modules imported from the script's directory are dropped so the
+        next model gets its own. The CUDA context and allocator caches are
+        shared across all models. Output is written to the given stdout and
+        stderr files, at both the Python and the file-descriptor level, so
+        nixnan's reports land there too. Returns the script's exit code.
+        """
+        model_dir = script_path.parent
+        saved_argv = sys.argv[:]
+        saved_path = sys.path[:]
+        saved_cwd = os.getcwd()
+        saved_modules = set(sys.modules)
+        returncode = 0
+        
+        def _on_timeout(signum, frame):
+            raise ScriptTimeout()
+        
+        sys.stdout.flush()
+        sys.stderr.flush()
+        saved_fds = os.dup(1), os.dup(2)
+        os.dup2(stdout.fileno(), 1)
+        os.dup2(stderr.fileno(), 2)
+        
+        previous_handler = signal.signal(signal.SIGALRM, _on_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+        try:
+            os.chdir(model_dir)
+            sys.argv = [str(script_path)]
+            sys.path.insert(0, str(model_dir))
+            with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+                try:
+                    runpy.run_path(str(script_path), run_name="__main__")
+                except SystemExit as e:
+                    if e.code is None or isinstance(e.code, int):
+                        returncode = e.code or 0
+                    else:
+                        print(e.code, file=sys.stderr)
+                        returncode = 1
+                except Exception:
+                    traceback.print_exc()
+                    returncode = 1
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous_handler)
+            stdout.flush()
+            stderr.flush()
+            for fd, saved_fd in zip((1, 2), saved_fds):
+                os.dup2(saved_fd, fd)
+                os.close(saved_fd)
+            os.chdir(saved_cwd)
+            sys.argv = saved_argv
+            sys.path[:] = saved_path
+            for name in set(sys.modules) - saved_modules:
+                module_file = getattr(sys.modules[name], '__file__', None) or ''
+                if module_file.startswith(str(model_dir)):
+                    del sys.modules[name]
+        
+        return returncode
+    
+    def _record_completed(self, model_name, returncode, out_path, err_path, elapsed_time):
+        """Record the result of a model script that ran to completion"""
+        if returncode == 0:
+            print(f"   ✅ {model_name} PASSED ({elapsed_time:.1f}s)")
+            self.results[model_name] = {
+                'status': 'PASSED',
+                'time': elapsed_time,
+                'stdout_path': out_path,
+                'stderr_path': err_path
+            }
+            self.passed += 1
+            return True
+        else:
+            print(f"   ❌ {model_name} FAILED ({elapsed_time:.1f}s)")
+            print(f"   Error: {last_line(err_path)}")
+            self.results[model_name] = {
+                'status': 'FAILED',
+                'time': elapsed_time,
+                'stdout_path': out_path,
+                'stderr_path': err_path,
+                'returncode': returncode
+            }
+            self.failed += 1
+            return False
+    
+    async def _run_on_free_gpu(self, model):
+        """Run a model test once a GPU is free, then hand the GPU back"""
+        gpu = await self._free_gpus.get()
+        try:
+            return await self.run_test(
+                model['name'],
+                model['script'], 
+                model['timeout'],
+                gpu=gpu
+            )
+        finally:
+            self._free_gpus.put_nowait(gpu)
+    
+    async def _run_in_series(self, models):
+        """Run models one after another, each on the next free GPU"""
+        for model in models:
+            await self._run_on_free_gpu(model)
+    
+    async def _run_all(self, models):
+        """Launch all model tests concurrently, at most one per visible GPU"""
+        gpus = visible_gpus()
+        slots = gpus or [None]
+        self._free_gpus = asyncio.Queue()
+        for gpu in slots:
+            self._free_gpus.put_nowait(gpu)
+        print(f"\nLaunching tests on {len(slots)} slot(s) ({len(gpus)} GPU(s) visible)...")
+        
+        # Models sharing a directory (Autoencoder / CNN Autoencoder) share its
+        # working files too, so they never run at the same time
+        by_dir = {}
+        for model in models:
+            by_dir.setdefault(model['script'].parent, []).append(model)
+        
+        await asyncio.gather(*(self._run_in_series(group) for group in by_dir.values()))
+    
+    def _existing_scripts(self, models):
+        """Scripts present on disk, found with one listing per directory"""
+        try:
+            with os.scandir(self.base_dir) as entries:
+                found = {entry.name: Path(entry.path) for entry in entries if entry.is_dir()}
+        except FileNotFoundError:
+            found = {}
+        
+        listings = {}
+        existing = set()
+        for model in models:
+            dir_name = model['script'].parent.name
+            if dir_name not in found:
+                continue
+            if dir_name not in listings:
+                with os.scandir(found[dir_name]) as entries:
+                    listings[dir_name] = {entry.name for entry in entries if entry.is_file()}
+            if model['script'].name in listings[dir_name]:
+                existing.add(model['script'])
+        return existing
+    
     def test_all_models(self):
         """Test all models"""
         
@@ -155,14 +380,11 @@ class ModelTester:
         
         total_start_time = time.time()
         
-        # Test each model
+        existing = self._existing_scripts(models)
+        runnable = []
         for model in models:
-            if model['script'].exists():
-                self.run_test(
-                    model['name'],
-                    model['script'], 
-                    model['timeout']
-                )
+            if model['script'] in existing:
+                runnable.append(model)
             else:
                 print(f"\n⚠️  {model['name']} script not found: {model['script']}")
                 self.results[model['name']] = {
@@ -172,11 +394,52 @@ class ModelTester:
                 }
                 self.failed += 1
         
+        if self.in_process:
+            # Test each model in this interpreter, sharing one CUDA context.
+            # Only worth warming up here: subprocesses would each start cold
+            if runnable:
+                print("\n🔥 Warming up GPU...", flush=True)
+                warm_up_gpu()
+            for model in runnable:
+                self.run_test_in_proc(model['name'], model['script'], model['timeout'])
+        else:
+            # Test all models concurrently
+            asyncio.run(self._run_all(runnable))
+        # Report results in definition order, not completion order
+        self.results = {model['name']: self.results[model['name']] for model in models}
+        self.print_model_outputs(runnable)
+        
         total_time = time.time() - total_start_time
         
         # Print summary
         self.print_summary(total_time)
     
+    def print_model_outputs(self, models):
+        """Print each model's captured output under its header, in definition order
+        
+        This is the raw trace (test_results_pytorch_GPU_test_all_models_py):
+        each model's output, nixnan findings included, sits between its
+        "🔄 Testing" and "---> Running" markers.
+        """
+        how = "in-process." if self.in_process else "with LD_PRELOAD set."
+        icons = {'PASSED': '✅', 'FAILED': '❌', 'TIMEOUT': '⏰'}
+        
+        for model in models:
+            result = self.results[model['name']]
+            print(f"\n🔄 Testing {model['name']}...")
+            print(f"   Script: {model['script']}")
+            sys.stdout.flush()
+            # these statuses mean this run wrote the logs; anything else may find stale ones
+            for path in log_paths(model['script']) if result['status'] in icons else ():
+                if path.exists():
+                    with open(path, errors='replace') as log:
+                        shutil.copyfileobj(log, sys.stdout)
+            print("---> Running :", model['script'].name, "", how)
+            print("Run of :", model['script'].name, " finished <---")
+            status = result['status']
+            print(f"   {icons.get(status, '❌')} {status} ({result.get('time', 0):.1f}s)")
+        sys.stdout.flush()
+    
     def print_summary(self, total_time):
         """Print test summary"""
         print("\n" + "=" * 60)
@@ -213,10 +476,10 @@ class ModelTester:
             print(f"{icon} {model_name:<20} {status:<12} ({time_taken:.1f}s)")
             
             # Show error details for failed tests
-            if status in ['FAILED', 'ERROR'] and 'stderr' in result:
-                stderr_lines = result['stderr'].strip().split('\n')
-                if stderr_lines and stderr_lines[0]:
-                    error_preview = stderr_lines[-1][:80] + "..." if len(stderr_lines[-1]) > 80 else stderr_lines[-1]
+            if status in ['FAILED', 'ERROR'] and 'stderr_path' in result:
+                stderr_line = last_line(result['stderr_path'])
+                if stderr_line:
+                    error_preview = stderr_line[:80] + "..." if len(stderr_line) > 80 else stderr_line
                     print(f"   └─ Error: {error_preview}")
         
         print("\n" + "=" * 60)
@@ -246,11 +509,11 @@ class ModelTester:
                 f.write(f"Status: {result['status']}\n")
                 f.write(f"Time: {result.get('time', 0):.1f}s\n")
                 
-                if 'stdout' in result:
-                    f.write(f"Output:\n{result['stdout']}\n")
+                if 'stdout_path' in result:
+                    f.write(f"Output:\n{result['stdout_path'].read_text(errors='replace')}\n")
                 
-                if 'stderr' in result:
-                    f.write(f"Errors:\n{result['stderr']}\n")
+                if 'stderr_path' in result:
+                    f.write(f"Errors:\n{result['stderr_path'].read_text(errors='replace')}\n")
                 
                 f.write("-" * 30 + "\n\n")
         
@@ -258,8 +521,16 @@ class ModelTester:
 
 def main():
     """Main test function"""
+    in_process = "--in-process" in sys.argv[1:]
+    
+    # In-process mode runs every model here, so nixnan must be preloaded into
+    # this interpreter: set LD_PRELOAD once and re-exec ourself
+    if in_process and "LD_PRELOAD" not in os.environ:
+        os.environ["LD_PRELOAD"] = NIXNAN_PATH
+        os.execv(sys.executable, [sys.executable, *sys.argv])
+    
     try:
-        tester = ModelTester()
+        tester = ModelTester(in_process=in_process)
         tester.test_all_models()
         tester.create_detailed_report()
         
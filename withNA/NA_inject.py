@@ -1,5 +1,76 @@
 import torch
-from functools import wraps
+from functools import lru_cache, wraps
+
+
+@lru_cache(maxsize=64)
+def _scratch(device: torch.device, numel: int, inference: bool):
+    """Reusable flat choice-draw buffer for tensors of `numel` elements on `device`.
+
+    The buffer is refilled in place on every call and only feeds comparisons that finish before the
+    corrupted tensor is returned, so autograd never holds on to it; least recently used sizes are evicted.
+    Keyed on inference mode too, since an inference tensor cannot be updated in place outside it.
+    """
+    return torch.empty(numel, device=device)
+
+
+@lru_cache(maxsize=256)
+def _tensor_positions(arg_types: tuple) -> tuple:
+    """Indices of the tensor arguments in a call with these argument types."""
+    return tuple(i for i, arg_type in enumerate(arg_types) if issubclass(arg_type, torch.Tensor))
+
+
+def _make_corruptor(
+    corruption_probability: float,
+    nan_frac: float,
+    posinf_frac: float,
+    neginf_frac: float,
+    generator: torch.Generator | None,
+):
+    """Return a function mapping a non-empty floating-point tensor to a corrupted copy of it."""
+    # bernoulli_ rejects p > 1; corrupting everything is what rand < p gave
+    corruption_probability = min(corruption_probability, 1.0)
+
+    # normalize corruption mix
+    sum_fractions = nan_frac + posinf_frac + neginf_frac
+    if sum_fractions > 0:  # Avoid division by zero
+        nan_frac, posinf_frac, neginf_frac = (
+            nan_frac / sum_fractions,
+            posinf_frac / sum_fractions,
+            neginf_frac / sum_fractions,
+        )
+
+    # draw < nan_upper → NaN, < posinf_upper → +∞, else –∞
+    nan_upper, posinf_upper = nan_frac, nan_frac + posinf_frac
+    _inf_cpu = torch.tensor([float("inf"), float("-inf")])
+    _consts = {}
+
+    def _dev_consts(device, dtype):
+        """0-dim (+∞, –∞) on `device` in `dtype`; copied once per pair."""
+        key = (device, dtype)
+        if key not in _consts:
+            _consts[key] = _inf_cpu.to(device, dtype, non_blocking=True).unbind()
+        return _consts[key]
+
+    def _corrupt(tensor):
+        device = tensor.device
+        choice_buffer = _scratch(device, tensor.numel(), torch.is_inference_mode_enabled())
+
+        # Draw a mask and a corruption kind for every element so that no step
+        # depends on how many elements were hit (no device→host sync).
+        # The mask is fresh per call: torch.where saves it for backward.
+        corruption_mask = torch.empty(tensor.shape, dtype=torch.bool, device=device)
+        corruption_mask.bernoulli_(corruption_probability, generator=generator)
+        torch.rand(choice_buffer.numel(), generator=generator, out=choice_buffer)
+        corruption_choice = choice_buffer.view(tensor.shape)  # free: the buffer is contiguous
+
+        # One full-size tensor in the input's dtype; the comparisons only add bool masks
+        posinf_value, neginf_value = _dev_consts(device, tensor.dtype)
+        corruption_values = torch.where(corruption_choice < posinf_upper, posinf_value, neginf_value)
+        corruption_values.masked_fill_(corruption_choice < nan_upper, float("nan"))
+
+        return torch.where(corruption_mask, corruption_values, tensor)
+
+    return _corrupt
 
 
 def inject(
@@ -41,58 +112,88 @@ def inject(
         generator (torch.Generator): Random generator for reproducibility (default: None)
 
     Returns:
-        Decorated function that corrupts input tensors before execution.
+        Decorated function that corrupts input tensors before execution
+        (the function itself, unchanged, when corruption_probability <= 0).
 
+    Only floating-point tensors are corrupted; integer and bool tensors pass through.
     Works on CPU & GPU, preserves autograd.
     """
-    # normalize corruption mix
-    sum_fractions = nan_frac + posinf_frac + neginf_frac
-    if sum_fractions > 0:  # Avoid division by zero
-        nan_frac, posinf_frac, neginf_frac = (
-            nan_frac / sum_fractions,
-            posinf_frac / sum_fractions,
-            neginf_frac / sum_fractions,
-        )
+    # nothing to inject → leave the function untouched
+    if corruption_probability <= 0:
+        return lambda forward_fn: forward_fn
+
+    _corrupt = _make_corruptor(corruption_probability, nan_frac, posinf_frac, neginf_frac, generator)
 
     def _decorator(forward_fn):
         @wraps(forward_fn)
         def _wrapper(*args, **kwargs):
-            new_args = list(args)
+            # call sites keep their argument types, so the tensor scan is cached per signature
+            positions = _tensor_positions(tuple(map(type, args)))
+            if not positions:
+                return forward_fn(*args, **kwargs)
 
-            # if first arg is a tensor, start from 0, else start from 1
-            start_index = 0 if (len(args) > 0 and torch.is_tensor(args[0])) else 1
-
-            for i in range(start_index, len(new_args)):
+            new_args = list(args)
+            for i in positions:
                 tensor = new_args[i]
-                if not torch.is_tensor(tensor) or corruption_probability <= 0 or tensor.numel() == 0:
+                # NaN/±∞ only exist for floating point; leave indices, masks and lengths alone
+                if not tensor.is_floating_point() or tensor.numel() == 0:
                     continue
+                new_args[i] = _corrupt(tensor)
 
-                # Make a copy to ensure we can modify it
-                corrupted_tensor = tensor.clone()
-                num_elements = corrupted_tensor.numel()
-                device = corrupted_tensor.device
-                random_generator = generator
+            return forward_fn(*new_args, **kwargs)
 
-                corruption_mask = torch.rand(num_elements, device=device, generator=random_generator) < corruption_probability
-                if not corruption_mask.any():
-                    continue
+        return _wrapper
+
+    return _decorator
 
-                corrupted_indices = corruption_mask.nonzero(as_tuple=False).squeeze(1)
-                corruption_choice = torch.rand(corrupted_indices.numel(), device=device, generator=random_generator)
 
-                corruption_values = torch.empty_like(corruption_choice)
-                corruption_values[corruption_choice < nan_frac] = torch.nan
-                corruption_values[
-                    (corruption_choice >= nan_frac) & (corruption_choice < nan_frac + posinf_frac)
-                ] = torch.inf
-                corruption_values[corruption_choice >= nan_frac + posinf_frac] = -torch.inf
+def make_inject_hook(
+    corruption_probability: float = 0.1,  # fraction of elements to corrupt
+    nan_frac: float = 1.0,  # share of corruptions that become NaN
+    posinf_frac: float = 0.0,  # … +∞
+    neginf_frac: float = 0.0,  # … –∞
+    generator: torch.Generator | None = None,
+):
+    """
+    Build a forward pre-hook that injects corruption (NaN, +∞, -∞) into the tensor inputs of leaf modules.
 
-                corrupted_tensor.view(-1)[corrupted_indices] = corruption_values
-                new_args[i] = corrupted_tensor
+    Containers (nn.Sequential, ResNet blocks, ...) are skipped: only modules without children
+    operate on tensors directly, so corrupting their inputs once is enough.
 
-            return forward_fn(*new_args, **kwargs)
+    Examples:
+        # Every leaf module in the process
+        handle = nn.modules.module.register_module_forward_pre_hook(make_inject_hook(0.05, 1.0))
+        ...
+        handle.remove()
 
-        return _wrapper
+        # Leaf modules of a single model
+        hook = make_inject_hook(corruption_probability=0.2, nan_frac=0.5, posinf_frac=0.5)
+        for module in model.modules():
+            module.register_forward_pre_hook(hook)
 
-    return _decorator
+    Parameters:
+        Same as `inject`.
 
+    Returns:
+        Hook taking (module, inputs) and returning the corrupted inputs, or None to leave them as is.
+    """
+    if corruption_probability <= 0:
+        return lambda module, inputs: None
+
+    _corrupt = _make_corruptor(corruption_probability, nan_frac, posinf_frac, neginf_frac, generator)
+
+    def _hook(module, inputs):
+        if module._modules:
+            return None
+        positions = _tensor_positions(tuple(map(type, inputs)))
+        if not positions:
+            return None
+
+        new_inputs = list(inputs)
+        for i in positions:
+            tensor = new_inputs[i]
+            if tensor.is_floating_point() and tensor.numel() > 0:
+                new_inputs[i] = _corrupt(tensor)
+        return tuple(new_inputs)
+
+    return _hook
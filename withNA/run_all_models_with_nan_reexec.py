@@ -6,6 +6,7 @@ into trace_withNA_output.txt (same format as test_results_* file).
 Usage:  python run_all_models_with_nan.py
 """
 
+import atexit
 import os
 import sys
 import pathlib
@@ -32,20 +33,23 @@ fd = os.open(TRACE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
 # duplicate to stdout (1) and stderr (2)
 os.dup2(fd, 1)
 os.dup2(fd, 2)
-# refresh sys stdout/err objects
-sys.stdout = os.fdopen(1, "w", buffering=1)
+# refresh sys stdout/err objects; stdout carries the volume, so block-buffer it
+# so each print is not its own write(). stderr stays line-buffered: a native
+# crash under nixnan skips atexit, and its tracebacks must not be lost
+sys.stdout = os.fdopen(1, "w", buffering=65536)
 sys.stderr = os.fdopen(2, "w", buffering=1)
+atexit.register(sys.stdout.flush)
 
 # ──────────────────────────────────────────────────────────────
-# 2) import NaN-decorator and wrap every nn.Module.forward
+# 2) import NaN-injector and hook the inputs of every leaf module
 # ──────────────────────────────────────────────────────────────
 sys.path.append(str(SCRIPT_DIR))     # allow importing NA_inject.py from current dir
-from NA_inject import inject        # noqa: E402
+from NA_inject import make_inject_hook  # noqa: E402
 
-nn.Module.forward = inject(
+nn.modules.module.register_module_forward_pre_hook(make_inject_hook(
     corruption_probability=0.05,    # 5 % of elements corrupted
     nan_frac=1.0                    # all corruptions become NaN
-)(nn.Module.forward)
+))
 
 print("🧪  Running test_all_models.py with NaN injection")
 print(f"Output is being captured in {TRACE}")
@@ -54,6 +58,8 @@ print("==========================================================")
 # ──────────────────────────────────────────────────────────────
 # 3) execute the original test suite
 # ──────────────────────────────────────────────────────────────
+# the hook lives in this interpreter, so the models must run here too
+sys.argv = [str(BASE / "noNA" / "test_all_models.py"), "--in-process"]
 runpy.run_path(str(BASE / "noNA" / "test_all_models.py"), run_name="__main__")
 
 print("\n✅  Finished. Full trace saved.")
\ No newline at end of file